@@ -1,9 +1,8 @@
 import requests
 import json
-import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.feature_extraction.text import TfidfVectorizer
+import threading
 from config import OPENAI_CONFIG, KNOWLEDGE_BASE
+from knowledge_index import load_index
 
 
 class AIProcessor:
@@ -15,10 +14,21 @@ class AIProcessor:
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
-        # Initialize knowledge base
+        # Knowledge base index is loaded on first retrieval, not at construction
         self.knowledge_base = KNOWLEDGE_BASE['faqs']
-        self.vectorizer = TfidfVectorizer().fit(self.knowledge_base)
-        self.kb_vectors = self.vectorizer.transform(self.knowledge_base)
+        self._kb_index = None
+        self._kb_lock = threading.Lock()
+        # Running totals of LLM usage, used to measure savings from incremental triage
+        self.usage = {'calls': 0, 'prompt_tokens': 0, 'completion_tokens': 0}
+
+    @property
+    def kb_index(self):
+        """Precomputed TF-IDF index of the knowledge base, loaded on first use"""
+        if self._kb_index is None:
+            with self._kb_lock:
+                if self._kb_index is None:
+                    self._kb_index = load_index(self.knowledge_base)
+        return self._kb_index
 
     def analyze_sentiment(self, text):
         """Analyze sentiment of the email text"""
@@ -66,8 +76,11 @@ class AIProcessor:
     def retrieve_knowledge(self, query, top_k=3):
         """Retrieve relevant knowledge from the knowledge base using TF-IDF similarity"""
         try:
-            query_vec = self.vectorizer.transform([query])
-            similarities = cosine_similarity(query_vec, self.kb_vectors).flatten()
+            from sklearn.metrics.pairwise import cosine_similarity
+
+            index = self.kb_index
+            query_vec = index['vectorizer'].transform([query])
+            similarities = cosine_similarity(query_vec, index['vectors']).flatten()
             top_indices = similarities.argsort()[-top_k:][::-1]
 
             relevant_knowledge = []
@@ -124,6 +137,58 @@ class AIProcessor:
         except:
             return "Unable to extract requirements"
 
+    def update_triage(self, new_text, thread):
+        """Incrementally triage a follow-up in an existing thread
+
+        Only the new (de-quoted) text is sent; the thread's current
+        sentiment, urgency and requirements are carried forward and updated
+        in a single call instead of re-running every stage from scratch.
+        """
+        previous = {
+            'sentiment': thread.get('sentiment') or 'Neutral',
+            'urgency': thread.get('urgency') or 'Not urgent',
+            'requirements': thread.get('requirements') or 'Not specified'
+        }
+
+        prompt = f"""
+        A customer has sent a follow-up in an existing support conversation.
+        Update the conversation's triage using the new message.
+
+        Current sentiment: {previous['sentiment']}
+        Current urgency: {previous['urgency']}
+        Current requirements: {previous['requirements']}
+
+        New message: {new_text}
+
+        Respond with only a JSON object with the keys "sentiment" (Positive, Negative or Neutral),
+        "urgency" (Urgent or Not urgent) and "requirements" (the updated concise summary of what the
+        customer needs, merging the current requirements with anything new).
+        """
+
+        try:
+            response = self._query_openai(prompt)
+            # Tolerate code fences or stray text around the JSON object
+            result = json.loads(response[response.find('{'):response.rfind('}') + 1])
+        except Exception as e:
+            print(f"Error updating triage: {e}")
+            return previous
+
+        sentiment = str(result.get('sentiment', '')).lower()
+        urgency = str(result.get('urgency', '')).lower()
+        if 'positive' in sentiment:
+            previous['sentiment'] = 'Positive'
+        elif 'negative' in sentiment:
+            previous['sentiment'] = 'Negative'
+        elif 'neutral' in sentiment:
+            previous['sentiment'] = 'Neutral'
+        if 'not' in urgency:
+            previous['urgency'] = 'Not urgent'
+        elif 'urgent' in urgency:
+            previous['urgency'] = 'Urgent'
+        if result.get('requirements'):
+            previous['requirements'] = str(result['requirements']).strip()
+        return previous
+
     def _query_openai(self, prompt):
         """Query the OpenAI API"""
         payload = {
@@ -150,6 +215,11 @@ class AIProcessor:
         )
 
         if response.status_code == 200:
-            return response.json()['choices'][0]['message']['content']
+            data = response.json()
+            usage = data.get('usage', {})
+            self.usage['calls'] += 1
+            self.usage['prompt_tokens'] += usage.get('prompt_tokens', 0)
+            self.usage['completion_tokens'] += usage.get('completion_tokens', 0)
+            return data['choices'][0]['message']['content']
         else:
             raise Exception(f"OpenAI API error: {response.status_code} - {response.text}")
\ No newline at end of file
@@ -1,25 +1,75 @@
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, Blueprint, current_app, render_template, jsonify, request
 from email_handler import EmailHandler
 from ai_processor import AIProcessor
 from datetime import datetime, timedelta
 import json
 from collections import defaultdict
 import traceback
+import threading
+import atexit
 import sqlite3
 import re
 import os
-from config import DATABASE_URI
+import time
+from config import DATABASE_PATH, COORDINATION_CONFIG
+from conversations import init_thread_tables, assign_thread, get_thread, has_prior_triage, record_triage, strip_quoted
+from coordination import Coordinator
 
-app = Flask(__name__)
-app.config.from_pyfile('config.py')
+bp = Blueprint('dashboard', __name__)
 
-email_handler = EmailHandler()
-ai_processor = AIProcessor()
+# Stay below SQLite's default limit on bound parameters per statement
+SQLITE_MAX_VARIABLES = 500
+
+# Statuses a user can set; New and Processing belong to the triage pipeline
+USER_STATUSES = ('Pending', 'Resolved')
+
+_component_lock = threading.Lock()
+
+
+def create_app(config=None):
+    """Application factory: build the Flask app without touching IMAP or the AI stack"""
+    app = Flask(__name__)
+    app.config.from_pyfile('config.py')
+    if config:
+        app.config.update(config)
+
+    init_db()
+    app.register_blueprint(bp)
+    return app
+
+
+def _get_component(name, factory):
+    """Return a per-app component, constructing it on first use"""
+    components = current_app.extensions.setdefault('linkenite', {})
+    if name not in components:
+        with _component_lock:
+            if name not in components:
+                components[name] = factory()
+    return components[name]
+
+
+def get_email_handler():
+    return _get_component('email_handler', EmailHandler)
+
+
+def get_ai_processor():
+    return _get_component('ai_processor', AIProcessor)
+
+
+def get_coordinator():
+    return _get_component('coordinator', _create_coordinator)
+
+
+def _create_coordinator():
+    coordinator = Coordinator.from_config()
+    # Hand the ingestion lease over on clean shutdown instead of waiting for it to expire
+    atexit.register(coordinator.release_leadership)
+    return coordinator
 
 
 # Database setup
 def init_db():
-    conn = sqlite3.connect('emails.db')
+    conn = sqlite3.connect(DATABASE_PATH, timeout=30)
     c = conn.cursor()
     c.execute('''
               CREATE TABLE IF NOT EXISTS emails
@@ -47,9 +97,28 @@ def init_db():
                   status
                   TEXT,
                   processed_at
+                  TEXT,
+                  message_id
+                  TEXT,
+                  thread_id
+                  TEXT,
+                  claimed_by
+                  TEXT,
+                  claimed_at
                   TEXT
               )
               ''')
+    # Databases created before threading/coordination support lack these columns
+    columns = {row[1] for row in c.execute('PRAGMA table_info(emails)')}
+    for column in ('message_id', 'thread_id', 'claimed_by', 'claimed_at'):
+        if column not in columns:
+            c.execute(f'ALTER TABLE emails ADD COLUMN {column} TEXT')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_emails_thread ON emails (thread_id)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_emails_status ON emails (status)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_emails_message_id ON emails (message_id)')
+    # WAL lets dashboard reads proceed while another worker holds the write lock
+    c.execute('PRAGMA journal_mode=WAL')
+    init_thread_tables(c)
     c.execute('''
               CREATE TABLE IF NOT EXISTS email_stats
               (
@@ -76,59 +145,339 @@ def init_db():
     conn.close()
 
 
-init_db()
-
-
 def get_db_connection():
-    conn = sqlite3.connect('emails.db')
+    conn = sqlite3.connect(DATABASE_PATH, timeout=30)
     conn.row_factory = sqlite3.Row
     return conn
 
 
-def load_emails_from_db():
+def load_threads_from_db():
+    """Load one row per conversation: its latest message, carrying the thread's triage"""
     conn = get_db_connection()
-    emails = conn.execute('SELECT * FROM emails').fetchall()
+    threads = conn.execute('''
+        SELECT e.*, COALESCE(t.message_count, 1) AS message_count
+        FROM emails e
+        LEFT JOIN threads t ON e.thread_id = t.thread_id
+        WHERE e.status NOT IN ('New', 'Processing')
+          AND (t.thread_id IS NULL OR e.id = t.last_email_id)
+    ''').fetchall()
     conn.close()
-    return [dict(email) for email in emails]
+    return [dict(thread) for thread in threads]
+
 
+def ingest_emails(emails):
+    """Record newly fetched emails as untriaged, threading them in arrival order
 
-def save_email_to_db(email_data):
+    Only the ingestion leader calls this. INSERT OR IGNORE leaves emails that
+    are already known (in any state) untouched, and a message already stored
+    under another id (e.g. a sequence number from before UIDs were used, or
+    a UID from before the mailbox's UIDVALIDITY changed) is not ingested again.
+    """
     conn = get_db_connection()
-    conn.execute('''
-        INSERT OR REPLACE INTO emails 
-        (id, sender, subject, body, date, sentiment, urgency, requirements, ai_response, status, processed_at)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    ''', (
-        email_data['id'], email_data['sender'], email_data['subject'], email_data['body'],
-        email_data['date'], email_data['sentiment'], email_data['urgency'], email_data['requirements'],
-        email_data['ai_response'], email_data['status'], email_data['processed_at']
-    ))
-    conn.commit()
-    conn.close()
+    ingested = 0
+    retired = []
+    try:
+        with conn:
+            for email_data in emails:
+                message_id = email_data.get('message_id')
+                cursor = conn.execute('''
+                    INSERT OR IGNORE INTO emails (id, sender, subject, body, date, message_id, status)
+                    SELECT ?, ?, ?, ?, ?, ?, 'New'
+                    WHERE ? IS NULL OR NOT EXISTS (SELECT 1 FROM emails WHERE message_id = ?)
+                ''', (
+                    email_data['id'], email_data['sender'], email_data['subject'], email_data['body'],
+                    email_data['date'], message_id, message_id, message_id
+                ))
+                if cursor.rowcount:
+                    assign_thread(conn, email_data)
+                    conn.execute('UPDATE emails SET thread_id = ? WHERE id = ?',
+                                 (email_data['thread_id'], email_data['id']))
+                    retired.extend(email_data.get('retired_email_ids', []))
+                    ingested += 1
+
+            if retired:
+                # Merged threads share one dashboard row, so the rows they replaced leave the stats
+                retired_emails = _select_emails(conn, 'id', retired).values()
+
+                def remove_retired(email_stats):
+                    for email in retired_emails:
+                        email_stats['total_received'] -= 1
+                        apply_status_change(email_stats, email['status'], None)
+                        _count(email_stats['by_sentiment'], email['sentiment'], -1)
+                        _count(email_stats['by_urgency'], email['urgency'], -1)
+
+                _update_stats(conn, remove_retired)
+    finally:
+        conn.close()
+    return ingested
+
+
+def claim_emails(worker_id, limit):
+    """Atomically move up to `limit` untriaged emails to Processing for this worker
+
+    Claims left unfinished for longer than claim_ttl (e.g. by a worker that
+    died) are taken over. An email is skipped while an earlier message in its
+    thread is still untriaged, so each thread is triaged in order and every
+    follow-up can build on the triage before it.
+    """
+    now = datetime.now()
+    stale_before = (now - timedelta(seconds=COORDINATION_CONFIG['claim_ttl'])).isoformat()
+    claimable = "(status = 'New' OR (status = 'Processing' AND claimed_at < ?))"
 
+    conn = get_db_connection()
+    conn.isolation_level = None
+    try:
+        # Take the write lock up front so concurrent claimers never pick the same rows
+        conn.execute('BEGIN IMMEDIATE')
+        candidates = conn.execute(f'''
+            SELECT id FROM emails
+            WHERE {claimable}
+              AND NOT EXISTS (SELECT 1 FROM emails AS earlier
+                              WHERE earlier.thread_id = emails.thread_id
+                                AND earlier.rowid < emails.rowid
+                                AND earlier.status IN ('New', 'Processing'))
+            ORDER BY rowid LIMIT ?
+        ''', (stale_before, limit)).fetchall()
+        claimed = []
+        for candidate in candidates:
+            cursor = conn.execute(
+                f"UPDATE emails SET status = 'Processing', claimed_by = ?, claimed_at = ? WHERE id = ? AND {claimable}",
+                (worker_id, now.isoformat(), candidate['id'], stale_before)
+            )
+            if cursor.rowcount:
+                claimed.append(candidate['id'])
+        emails = [dict(email) for email in conn.execute(
+            f"SELECT * FROM emails WHERE id IN ({', '.join('?' for _ in claimed)})", claimed
+        )] if claimed else []
+        conn.execute('COMMIT')
+        return emails
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    finally:
+        conn.close()
+
+
+def _shown_triage(conn, thread_id):
+    """Return the sentiment, urgency and status of a thread's dashboard row, or None if it has none yet"""
+    return conn.execute('''
+        SELECT t.sentiment, t.urgency, e.status
+        FROM threads t
+        JOIN emails e ON e.id = t.last_email_id
+        WHERE t.thread_id = ?
+    ''', (thread_id,)).fetchone()
+
+
+def _record_thread_triage(conn, email_data):
+    """Record a saved triage on its thread and return the resulting change to the stats
+
+    Stats count conversations, like the dashboard rows: a thread's first
+    triaged message adds one, a newer follow-up moves the thread's
+    sentiment, urgency and status counts, and a late save of an older
+    message changes nothing.
+    """
+    change = _stats_from_row(None)
+    shown = None
+    if email_data.get('thread_id'):
+        shown = _shown_triage(conn, email_data['thread_id'])
+        if not record_triage(conn, email_data):
+            return change
+
+    if shown is None:
+        change['total_received'] += 1
+        apply_status_change(change, None, 'Pending')
+    else:
+        _count(change['by_sentiment'], shown['sentiment'], -1)
+        _count(change['by_urgency'], shown['urgency'], -1)
+        apply_status_change(change, shown['status'], 'Pending')
+    _count(change['by_sentiment'], email_data['sentiment'], 1)
+    _count(change['by_urgency'], email_data['urgency'], 1)
+    return change
 
-def update_email_in_db(email_id, updates):
+
+def save_triage_to_db(email_data, worker_id):
+    """Store a finished triage if this worker still owns the claim
+
+    On success the change it makes to the stats is left in email_data['stats_change'].
+    """
     conn = get_db_connection()
-    set_clause = ', '.join([f"{key} = ?" for key in updates.keys()])
-    values = list(updates.values())
-    values.append(email_id)
-    conn.execute(f'UPDATE emails SET {set_clause} WHERE id = ?', values)
-    conn.commit()
-    conn.close()
+    try:
+        with conn:
+            cursor = conn.execute('''
+                UPDATE emails
+                SET sentiment = ?, urgency = ?, requirements = ?, ai_response = ?,
+                    status = 'Pending', processed_at = ?, claimed_by = NULL, claimed_at = NULL
+                WHERE id = ? AND status = 'Processing' AND claimed_by = ?
+            ''', (
+                email_data['sentiment'], email_data['urgency'], email_data['requirements'],
+                email_data['ai_response'], email_data['processed_at'], email_data['id'], worker_id
+            ))
+            saved = bool(cursor.rowcount)
+            if saved:
+                # The thread may have been merged into another since the email was claimed
+                email_data['thread_id'] = conn.execute(
+                    'SELECT thread_id FROM emails WHERE id = ?', (email_data['id'],)
+                ).fetchone()['thread_id']
+                email_data['stats_change'] = _record_thread_triage(conn, email_data)
+    finally:
+        conn.close()
+    return saved
+
+
+def triage_pending_emails(worker_id, batch, time_budget):
+    """Claim and triage `batch` emails at a time until `time_budget` seconds have passed or none can be claimed
+
+    Claiming in small batches keeps a poll cut short (e.g. by the gunicorn
+    worker timeout) from stranding many claims until claim_ttl, and
+    claiming again after each batch picks up follow-ups that were waiting
+    on a message this worker has just triaged. The budget is only checked
+    between batches, so a poll can run over it by one batch.
+    """
+    ai_processor = get_ai_processor()
+    triaged = []
+    started = time.monotonic()
+    while time.monotonic() - started < time_budget:
+        claimed = claim_emails(worker_id, batch)
+        if not claimed:
+            break
+
+        for email_data in claimed:
+            thread = None
+            if email_data.get('thread_id'):
+                conn = get_db_connection()
+                thread = get_thread(conn, email_data['thread_id'])
+                conn.close()
+
+            if thread and has_prior_triage(thread):
+                # Follow-up: send only the new text and build on the thread's triage
+                new_text = strip_quoted(email_data['body'])
+                email_data.update(ai_processor.update_triage(new_text, thread))
+                email_data['ai_response'] = ai_processor.generate_response(dict(email_data, body=new_text))
+            else:
+                # Analyze with AI
+                email_data['sentiment'] = ai_processor.analyze_sentiment(email_data['body'])
+                email_data['urgency'] = ai_processor.determine_urgency(email_data['body'])
+                email_data['requirements'] = ai_processor.extract_requirements(email_data['body'])
+                email_data['ai_response'] = ai_processor.generate_response(email_data)
+            email_data['processed_at'] = datetime.now().isoformat()
 
+            # Save to database
+            if save_triage_to_db(email_data, worker_id):
+                triaged.append(email_data)
 
-def load_stats_from_db():
+    return triaged
+
+
+def _select_emails(conn, column, values):
+    """Load emails whose `column` is one of `values`, keyed by id"""
+    values = list(values)
+    emails = {}
+    for start in range(0, len(values), SQLITE_MAX_VARIABLES):
+        chunk = values[start:start + SQLITE_MAX_VARIABLES]
+        placeholders = ', '.join('?' for _ in chunk)
+        for email in conn.execute(f'SELECT * FROM emails WHERE {column} IN ({placeholders})', chunk):
+            emails[email['id']] = dict(email)
+    return emails
+
+
+def load_emails_by_ids(email_ids):
+    """Load the given emails keyed by id"""
     conn = get_db_connection()
-    stats = conn.execute('SELECT * FROM email_stats ORDER BY id DESC LIMIT 1').fetchone()
+    emails = _select_emails(conn, 'id', email_ids)
     conn.close()
+    return emails
+
+
+def _thread_statuses(conn, emails):
+    """Map the given emails and every triaged message in their threads to their status
+
+    The dashboard shows one row per thread, so a status change on that row
+    applies to the whole conversation.
+    """
+    statuses = {email_id: email['status'] for email_id, email in emails.items()}
+    thread_ids = {email['thread_id'] for email in emails.values() if email.get('thread_id')}
+    for email_id, email in _select_emails(conn, 'thread_id', thread_ids).items():
+        if email['status'] in USER_STATUSES:
+            statuses[email_id] = email['status']
+    return statuses
+
+
+def _shown_statuses(conn, emails):
+    """Map each dashboard row the given emails belong to onto the status it shows"""
+    statuses = {}
+    for email_id, email in emails.items():
+        thread_id = email.get('thread_id')
+        if not thread_id:
+            statuses[('email', email_id)] = email['status']
+        elif ('thread', thread_id) not in statuses:
+            shown = _shown_triage(conn, thread_id)
+            if shown:
+                statuses[('thread', thread_id)] = shown['status']
+    return statuses
+
+
+def set_statuses_in_db(email_ids, status):
+    """Set the status of emails and the rest of their threads, updating stats in the same transaction
+
+    Returns the emails that exist, keyed by id, and the ids whose status was set.
+    Emails still being triaged are left alone.
+    """
+    conn = get_db_connection()
+    conn.isolation_level = None
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        # Old statuses are read under the write lock so concurrent changes are never double-counted
+        found = _select_emails(conn, 'id', email_ids)
+        targets = {email_id: email for email_id, email in found.items() if email['status'] in USER_STATUSES}
+        shown = _shown_statuses(conn, targets)
+        affected = _thread_statuses(conn, targets)
+        for email_id in affected:
+            conn.execute('UPDATE emails SET status = ? WHERE id = ?', (status, email_id))
+
+        def apply_changes(email_stats):
+            # Stats count conversations, so each thread moves once however many of its messages were given
+            for old_status in shown.values():
+                apply_status_change(email_stats, old_status, status)
+
+        _update_stats(conn, apply_changes)
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    finally:
+        conn.close()
+    return found, list(affected)
 
+
+def update_email_in_db(email_id, updates):
+    update_emails_in_db({email_id: updates})
+
+
+def update_emails_in_db(updates_by_id):
+    """Apply per-email updates in one transaction, returning the ids that exist"""
+    conn = get_db_connection()
+    updated = []
+    try:
+        with conn:
+            for email_id, updates in updates_by_id.items():
+                set_clause = ', '.join([f"{key} = ?" for key in updates.keys()])
+                values = list(updates.values())
+                values.append(email_id)
+                if conn.execute(f'UPDATE emails SET {set_clause} WHERE id = ?', values).rowcount:
+                    updated.append(email_id)
+    finally:
+        conn.close()
+    return updated
+
+
+def _stats_from_row(stats):
     if stats:
         return {
             'total_received': stats['total_received'],
             'resolved': stats['resolved'],
             'pending': stats['pending'],
-            'by_sentiment': json.loads(stats['by_sentiment']),
-            'by_urgency': json.loads(stats['by_urgency']),
+            'by_sentiment': defaultdict(int, json.loads(stats['by_sentiment'])),
+            'by_urgency': defaultdict(int, json.loads(stats['by_urgency'])),
             'last_updated': stats['last_updated']
         }
     else:
@@ -142,8 +491,74 @@ def load_stats_from_db():
         }
 
 
-def save_stats_to_db(stats):
+def load_stats_from_db():
     conn = get_db_connection()
+    stats = conn.execute('SELECT * FROM email_stats ORDER BY id DESC LIMIT 1').fetchone()
+    conn.close()
+
+    return _stats_from_row(stats)
+
+
+def update_stats_in_db(apply):
+    """Apply changes to the latest stats snapshot and save it as a new one
+
+    The read and the insert happen under one write lock, so workers updating
+    stats concurrently never overwrite each other's counts.
+    """
+    conn = get_db_connection()
+    conn.isolation_level = None
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        email_stats = _update_stats(conn, apply)
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+    finally:
+        conn.close()
+    return email_stats
+
+
+def _update_stats(conn, apply):
+    """Read, change and re-insert the latest stats snapshot inside the caller's transaction"""
+    email_stats = _stats_from_row(
+        conn.execute('SELECT * FROM email_stats ORDER BY id DESC LIMIT 1').fetchone()
+    )
+    apply(email_stats)
+    email_stats['last_updated'] = datetime.now().isoformat()
+    _insert_stats(conn, email_stats)
+    return email_stats
+
+
+def apply_status_change(stats, old_status, new_status):
+    """Move one conversation between the pending and resolved counts
+
+    Pass None as old_status for a conversation that is new to the stats,
+    or as new_status for one that leaves them.
+    """
+    for status, step in ((old_status, -1), (new_status, 1)):
+        if status == 'Pending':
+            stats['pending'] += step
+        elif status == 'Resolved':
+            stats['resolved'] += step
+
+
+def _count(counts, key, step):
+    counts[key] += step
+    if not counts[key]:
+        del counts[key]
+
+
+def apply_stats_change(stats, change):
+    """Add a change built by _record_thread_triage to a stats snapshot"""
+    for key in ('total_received', 'resolved', 'pending'):
+        stats[key] += change[key]
+    for key in ('by_sentiment', 'by_urgency'):
+        for value, step in change[key].items():
+            _count(stats[key], value, step)
+
+
+def _insert_stats(conn, stats):
     conn.execute('''
                  INSERT INTO email_stats (total_received, resolved, pending, by_sentiment, by_urgency, last_updated)
                  VALUES (?, ?, ?, ?, ?, ?)
@@ -155,55 +570,38 @@ def save_stats_to_db(stats):
                      json.dumps(dict(stats['by_urgency'])),
                      stats['last_updated']
                  ))
-    conn.commit()
-    conn.close()
 
 
-@app.route('/')
+@bp.route('/')
 def dashboard():
     return render_template('index.html')
 
 
-@app.route('/api/emails')
+@bp.route('/api/emails')
 def get_emails():
-    """Retrieve and process emails"""
+    """Retrieve and process emails, returning one row per conversation thread"""
     try:
-        # Load existing data from database
-        processed_emails = load_emails_from_db()
-        email_stats = load_stats_from_db()
-
-        # Get emails from the last 24 hours
-        emails = email_handler.search_emails()
-
-        # Process each email with AI
-        for email_data in emails:
-            # Skip if already processed
-            if any(e['id'] == email_data['id'] for e in processed_emails):
-                continue
-
-            # Analyze with AI
-            email_data['sentiment'] = ai_processor.analyze_sentiment(email_data['body'])
-            email_data['urgency'] = ai_processor.determine_urgency(email_data['body'])
-            email_data['requirements'] = ai_processor.extract_requirements(email_data['body'])
-            email_data['ai_response'] = ai_processor.generate_response(email_data)
-            email_data['status'] = 'Pending'
-            email_data['processed_at'] = datetime.now().isoformat()
+        coordinator = get_coordinator()
 
-            # Save to database
-            save_email_to_db(email_data)
-            processed_emails.append(email_data)
+        # Only the lease holder talks to IMAP, so workers never ingest the same mail twice
+        if coordinator.try_acquire_leadership():
+            # Get emails from the last 24 hours
+            ingest_emails(get_email_handler().search_emails())
 
-            # Update stats
-            email_stats['total_received'] += 1
-            email_stats['pending'] += 1
-            email_stats['by_sentiment'][email_data['sentiment']] += 1
-            email_stats['by_urgency'][email_data['urgency']] += 1
+        # Every worker shares the AI work by claiming untriaged emails
+        triaged = triage_pending_emails(
+            coordinator.worker_id, COORDINATION_CONFIG['triage_batch'], COORDINATION_CONFIG['triage_time_budget']
+        )
+
+        def apply_triage(email_stats):
+            for email_data in triaged:
+                apply_stats_change(email_stats, email_data['stats_change'])
 
         # Save updated stats to database
-        email_stats['last_updated'] = datetime.now().isoformat()
-        save_stats_to_db(email_stats)
+        email_stats = update_stats_in_db(apply_triage)
 
         # Sort by urgency (urgent first) and then by date
+        processed_emails = load_threads_from_db()
         processed_emails.sort(key=lambda x: (0 if x['urgency'] == 'Urgent' else 1, x['date']), reverse=True)
 
         return jsonify({
@@ -214,50 +612,108 @@ def get_emails():
         print(f"Error in get_emails: {e}")
         print(traceback.format_exc())
         return jsonify({
-            'emails': load_emails_from_db(),
+            'emails': load_threads_from_db(),
             'stats': load_stats_from_db(),
             'error': str(e)
         })
 
 
-@app.route('/api/emails/<email_id>/update', methods=['POST'])
-def update_email(email_id):
-    """Update email status"""
-    data = request.json
-    status = data.get('status')
+def recipient_address(sender):
+    """Extract the bare address from a From header such as 'Name <a@b.com>'"""
+    email_match = re.search(r'<(.+?)>', sender)
+    return email_match.group(1) if email_match else sender
+
+
+def update_statuses(email_ids, status):
+    """Set the status of several emails, returning a result per id"""
+    found, affected = set_statuses_in_db(email_ids, status)
+
+    results = {}
+    for email_id in email_ids:
+        if email_id not in found:
+            results[email_id] = {'success': False, 'error': 'Email not found'}
+        elif found[email_id]['status'] not in USER_STATUSES:
+            results[email_id] = {'success': False, 'error': 'Email has not been triaged yet'}
+        else:
+            results[email_id] = {'success': True}
+
+    # Mark as read in email server
+    if status == 'Resolved' and affected:
+        get_email_handler().mark_as_processed(affected)
+
+    return results
 
-    # Load current stats
-    email_stats = load_stats_from_db()
-    processed_emails = load_emails_from_db()
 
-    for email in processed_emails:
-        if email['id'] == email_id:
-            old_status = email['status']
+def send_responses(responses):
+    """Send replies for several emails over one SMTP session, returning a result per id
 
-            # Update email in database
-            update_email_in_db(email_id, {'status': status})
+    responses maps email id to the response text to send.
+    """
+    emails = load_emails_by_ids(responses)
+    results = {email_id: {'success': False, 'error': 'Email not found'} for email_id in responses}
 
-            # Update stats
-            if old_status == 'Pending' and status == 'Resolved':
-                email_stats['pending'] -= 1
-                email_stats['resolved'] += 1
-            elif old_status == 'Resolved' and status == 'Pending':
-                email_stats['resolved'] -= 1
-                email_stats['pending'] += 1
+    queued = []
+    for email_id, response in responses.items():
+        email = emails.get(email_id)
+        if email and email['status'] not in USER_STATUSES:
+            results[email_id] = {'success': False, 'error': 'Email has not been triaged yet'}
+        elif email:
+            queued.append((email_id, {
+                'to_email': recipient_address(email['sender']),
+                'subject': f"Re: {email['subject']}",
+                'body': response,
+                'reply_to': email.get('message_id') or email_id
+            }))
+    if not queued:
+        return results
 
-            # Save updated stats
-            email_stats['last_updated'] = datetime.now().isoformat()
-            save_stats_to_db(email_stats)
+    # Send emails
+    sent = get_email_handler().send_emails([message for _, message in queued])
 
-            # Mark as read in email server
-            email_handler.mark_as_processed(email_id)
+    resolved = []
+    for (email_id, _), success in zip(queued, sent):
+        if success:
+            resolved.append(email_id)
+            results[email_id] = {'success': True}
+        else:
+            results[email_id] = {'success': False, 'error': 'Failed to send email'}
 
-            return jsonify({'success': True})
+    if resolved:
+        # Replying resolves the whole conversation, stats included
+        set_statuses_in_db(resolved, 'Resolved')
 
-    return jsonify({'success': False, 'error': 'Email not found'})
+    return results
 
 
-@app.route('/api/emails/<email_id>/response', methods=['POST'])
+def _bulk_items(data, *fields):
+    """Validate a bulk request's items list and return it as [(id, {field: value})]"""
+    items = (data or {}).get('items')
+    if not isinstance(items, list) or not all(isinstance(item, dict) and 'id' in item for item in items):
+        return None
+    # Later entries for the same id win, matching the order they would apply in
+    merged = {}
+    for item in items:
+        merged[str(item['id'])] = {field: item.get(field) for field in fields}
+    return list(merged.items())
+
+
+def _bulk_response(results):
+    items = [dict(id=email_id, **result) for email_id, result in results.items()]
+    return jsonify({'success': all(item['success'] for item in items), 'results': items})
+
+
+@bp.route('/api/emails/<email_id>/update', methods=['POST'])
+def update_email(email_id):
+    """Update email status"""
+    data = request.json
+    status = data.get('status')
+    if status not in USER_STATUSES:
+        return jsonify({'success': False, 'error': "status must be 'Pending' or 'Resolved'"})
+
+    return jsonify(update_statuses([email_id], status)[email_id])
+
+
+@bp.route('/api/emails/<email_id>/response', methods=['POST'])
 def update_response(email_id):
     """Update AI response"""
     data = request.json
@@ -269,59 +725,61 @@ def update_response(email_id):
     return jsonify({'success': True})
 
 
-@app.route('/api/emails/<email_id>/send', methods=['POST'])
+@bp.route('/api/emails/<email_id>/send', methods=['POST'])
 def send_response(email_id):
     """Send response email"""
     data = request.json
     response = data.get('response')
 
-    # Get email details
-    processed_emails = load_emails_from_db()
-    email = next((e for e in processed_emails if e['id'] == email_id), None)
+    return jsonify(send_responses({email_id: response})[email_id])
 
-    if not email:
-        return jsonify({'success': False, 'error': 'Email not found'})
 
-    # Extract recipient email
-    sender_email = email['sender']
-    # Simple email extraction from sender field
-    email_match = re.search(r'<(.+?)>', sender_email)
-    if email_match:
-        recipient_email = email_match.group(1)
-    else:
-        recipient_email = sender_email
-
-    # Send email
-    success = email_handler.send_email(
-        recipient_email,
-        f"Re: {email['subject']}",
-        response,
-        reply_to=email_id
-    )
+@bp.route('/api/emails/bulk/update', methods=['POST'])
+def bulk_update_emails():
+    """Update the status of many emails: {"ids": [...], "status": "Resolved"}"""
+    data = request.json or {}
+    email_ids = data.get('ids')
+    if not isinstance(email_ids, list):
+        return jsonify({'success': False, 'error': 'ids must be a list'})
+    if data.get('status') not in USER_STATUSES:
+        return jsonify({'success': False, 'error': "status must be 'Pending' or 'Resolved'"})
 
-    if success:
-        # Update status to resolved
-        update_email_in_db(email_id, {'status': 'Resolved'})
+    # De-duplicate while keeping request order
+    email_ids = list(dict.fromkeys(str(email_id) for email_id in email_ids))
+    return _bulk_response(update_statuses(email_ids, data.get('status')))
 
-        # Update stats
-        email_stats = load_stats_from_db()
-        email_stats['pending'] -= 1
-        email_stats['resolved'] += 1
-        email_stats['last_updated'] = datetime.now().isoformat()
-        save_stats_to_db(email_stats)
 
-        return jsonify({'success': True})
-    else:
-        return jsonify({'success': False, 'error': 'Failed to send email'})
+@bp.route('/api/emails/bulk/response', methods=['POST'])
+def bulk_update_responses():
+    """Edit many AI responses: {"items": [{"id": ..., "response": ...}]}"""
+    items = _bulk_items(request.json, 'response')
+    if items is None:
+        return jsonify({'success': False, 'error': 'items must be a list of objects with an id'})
+
+    updated = set(update_emails_in_db({email_id: {'ai_response': item['response']} for email_id, item in items}))
+    return _bulk_response({
+        email_id: {'success': True} if email_id in updated else {'success': False, 'error': 'Email not found'}
+        for email_id, _ in items
+    })
+
+
+@bp.route('/api/emails/bulk/send', methods=['POST'])
+def bulk_send_responses():
+    """Send many responses in one batch: {"items": [{"id": ..., "response": ...}]}"""
+    items = _bulk_items(request.json, 'response')
+    if items is None:
+        return jsonify({'success': False, 'error': 'items must be a list of objects with an id'})
+
+    return _bulk_response(send_responses({email_id: item['response'] for email_id, item in items}))
 
 
-@app.route('/api/stats')
+@bp.route('/api/stats')
 def get_stats():
     """Get statistics"""
     return jsonify(load_stats_from_db())
 
 
-@app.route('/api/stats/history')
+@bp.route('/api/stats/history')
 def get_stats_history():
     """Get historical statistics for charts"""
     conn = get_db_connection()
@@ -343,4 +801,5 @@ def get_stats_history():
 
 
 if __name__ == '__main__':
+    app = create_app()
     app.run(debug=app.config['DEBUG'])
\ No newline at end of file
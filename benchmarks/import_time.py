@@ -0,0 +1,71 @@
+"""Track the cost of importing the web app with `python -X importtime`.
+
+Usage:
+    python benchmarks/import_time.py [--module app] [--runs 5] [--top 15] [--budget-ms 500]
+
+Exits non-zero when the median cumulative import time of the module exceeds
+the budget, so it can be wired into CI to catch heavy imports creeping back
+into module scope.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(module):
+    """Import the module in a fresh interpreter and return {package: (self_us, cumulative_us)}"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--module', default='app')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--budget-ms', type=float, default=None)
+    args = parser.parse_args()
+
+    runs = [measure(args.module) for _ in range(args.runs)]
+    totals_ms = [run[args.module][1] / 1000 for run in runs]
+    median_ms = statistics.median(totals_ms)
+
+    print(f"import {args.module}: median {median_ms:.1f} ms over {args.runs} runs "
+          f"(min {min(totals_ms):.1f} ms, max {max(totals_ms):.1f} ms)")
+
+    last = runs[-1]
+    heaviest = sorted(last.items(), key=lambda item: item[1][1], reverse=True)[:args.top]
+    print(f"\n{'cumulative ms':>14} {'self ms':>9}  package")
+    for name, (self_us, cumulative_us) in heaviest:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+
+    for heavy in ('sklearn', 'numpy', 'scipy'):
+        if heavy in last:
+            print(f"\nWARNING: {heavy} is imported at module load time")
+
+    if args.budget_ms is not None and median_ms > args.budget_ms:
+        print(f"\nFAIL: {median_ms:.1f} ms exceeds budget of {args.budget_ms:.1f} ms")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
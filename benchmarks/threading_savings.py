@@ -0,0 +1,143 @@
+"""Measure LLM calls and tokens saved by incremental triage of threaded follow-ups.
+
+Usage:
+    python benchmarks/threading_savings.py [--threads 20] [--depth 4]
+
+Builds a synthetic mailbox of conversations where every follow-up quotes the
+whole previous message, as mail clients do, then triages it twice with an
+offline AI processor that counts calls and estimates tokens (~4 characters
+per token): once treating every message as new, and once through the
+threading index.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+from email.message import EmailMessage
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_processor import AIProcessor  # noqa: E402
+from conversations import init_thread_tables, assign_thread, has_prior_triage, record_triage, strip_quoted  # noqa: E402
+from email_handler import EmailHandler  # noqa: E402
+
+ISSUES = [
+    "I cannot log in to my account since this morning, the password reset link never arrives.",
+    "Our invoice for last month was charged twice and we need a refund for the duplicate payment.",
+    "The API keeps returning 500 errors when we call the export endpoint with large date ranges.",
+    "We would like to upgrade to the enterprise plan and need details on 24/7 support.",
+]
+FOLLOW_UPS = [
+    "Any update on this? It is still happening and is blocking our team.",
+    "I tried the steps you suggested but the problem persists on every browser.",
+    "Thanks, that partly worked, but now I also need the change applied to my colleague's account.",
+    "This is now critical for us, we have a client demo tomorrow.",
+]
+
+
+class OfflineAIProcessor(AIProcessor):
+    """AIProcessor whose model calls are counted instead of sent to OpenAI"""
+
+    def _query_openai(self, prompt):
+        reply = '{"sentiment": "Negative", "urgency": "Urgent", "requirements": "Resolve the reported issue."}' \
+            if '"requirements"' in prompt else 'Negative'
+        self.usage['calls'] += 1
+        self.usage['prompt_tokens'] += len(prompt) // 4
+        self.usage['completion_tokens'] += len(reply) // 4
+        return reply
+
+
+def build_mailbox(threads, depth):
+    """Return parsed email dicts for `threads` conversations of `depth` messages each"""
+    handler = EmailHandler()
+    mailbox = []
+    seq = 0
+    for t in range(threads):
+        references = []
+        previous_body = None
+        subject = f"Support request #{t}: {ISSUES[t % len(ISSUES)][:40]}"
+        for d in range(depth):
+            seq += 1
+            msg = EmailMessage()
+            msg['From'] = f"Customer {t} <customer{t}@example.com>"
+            msg['Subject'] = subject if d == 0 else f"Re: {subject}"
+            msg['Date'] = f"Mon, 1 Jan 2024 {d:02d}:{t % 60:02d}:00 +0000"
+            msg['Message-ID'] = f"<msg-{t}-{d}@example.com>"
+            if references:
+                msg['In-Reply-To'] = references[-1]
+                msg['References'] = ' '.join(references)
+
+            body = ISSUES[t % len(ISSUES)] if d == 0 else FOLLOW_UPS[(t + d) % len(FOLLOW_UPS)]
+            if previous_body:
+                quoted = '\n'.join(f"> {line}" for line in previous_body.splitlines())
+                body = f"{body}\n\nOn Mon, 1 Jan 2024, Support <support@company.com> wrote:\n{quoted}"
+            msg.set_content(body)
+
+            mailbox.append(handler.parse_email(msg, str(seq).encode(), msg['Subject']))
+            references.append(msg['Message-ID'])
+            previous_body = body
+    return mailbox
+
+
+def triage_full(ai, mailbox):
+    for email_data in mailbox:
+        email_data = dict(email_data)
+        email_data['sentiment'] = ai.analyze_sentiment(email_data['body'])
+        email_data['urgency'] = ai.determine_urgency(email_data['body'])
+        email_data['requirements'] = ai.extract_requirements(email_data['body'])
+        ai.generate_response(email_data)
+
+
+def triage_threaded(ai, mailbox):
+    conn = sqlite3.connect(':memory:')
+    conn.row_factory = sqlite3.Row
+    conn.execute('CREATE TABLE emails (id TEXT PRIMARY KEY, thread_id TEXT)')
+    init_thread_tables(conn)
+
+    for email_data in mailbox:
+        email_data = dict(email_data)
+        conn.execute('INSERT INTO emails (id) VALUES (?)', (email_data['id'],))
+        thread = assign_thread(conn, email_data)
+        if has_prior_triage(thread):
+            new_text = strip_quoted(email_data['body'])
+            email_data.update(ai.update_triage(new_text, thread))
+            ai.generate_response(dict(email_data, body=new_text))
+        else:
+            email_data['sentiment'] = ai.analyze_sentiment(email_data['body'])
+            email_data['urgency'] = ai.determine_urgency(email_data['body'])
+            email_data['requirements'] = ai.extract_requirements(email_data['body'])
+            ai.generate_response(email_data)
+        record_triage(conn, email_data)
+
+    thread_count = conn.execute('SELECT COUNT(*) FROM threads').fetchone()[0]
+    conn.close()
+    return thread_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=20)
+    parser.add_argument('--depth', type=int, default=4)
+    args = parser.parse_args()
+
+    mailbox = build_mailbox(args.threads, args.depth)
+
+    full = OfflineAIProcessor()
+    triage_full(full, mailbox)
+    threaded = OfflineAIProcessor()
+    thread_count = triage_threaded(threaded, mailbox)
+
+    print(f"{len(mailbox)} messages in {thread_count} threads (expected {args.threads})")
+    print(f"{'':>16} {'calls':>8} {'prompt tok':>11} {'completion tok':>15}")
+    for name, ai in (('full', full), ('threaded', threaded)):
+        print(f"{name:>16} {ai.usage['calls']:>8} {ai.usage['prompt_tokens']:>11} "
+              f"{ai.usage['completion_tokens']:>15}")
+
+    for key in ('calls', 'prompt_tokens'):
+        saved = 1 - threaded.usage[key] / full.usage[key]
+        print(f"{key} reduction: {saved:.1%}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
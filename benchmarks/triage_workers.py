@@ -0,0 +1,161 @@
+"""Measure how triage throughput scales with the number of worker processes.
+
+Usage:
+    python benchmarks/triage_workers.py [--emails 160] [--depth 1,4] [--workers 1,2,4,8] [--latency 0.05]
+                                        [--batch N] [--time-budget SECONDS]
+
+For each thread depth and worker count, seeds a fresh database with
+untriaged emails (conversations of `depth` messages), lets one worker win
+the ingestion lease, then has every worker poll (claim and triage batches
+until its time budget runs out, as in a dashboard request) until none are
+left. Batch size and time budget default to COORDINATION_CONFIG. Model calls are simulated with a fixed sleep per call, like
+a real LLM round trip. Checks that no email is triaged twice, that every
+follow-up is triaged incrementally (2 calls instead of 4) and that each
+thread ends on its newest message, and reports throughput and scaling
+efficiency against one worker.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.threading_savings import OfflineAIProcessor, build_mailbox  # noqa: E402
+from config import COORDINATION_CONFIG  # noqa: E402
+
+
+class SlowOfflineAIProcessor(OfflineAIProcessor):
+    latency = 0.01
+
+    def _query_openai(self, prompt):
+        time.sleep(self.latency)
+        return super()._query_openai(prompt)
+
+
+def run_worker(workdir, latency, batch, time_budget, start, results):
+    os.chdir(workdir)
+    import app
+
+    flask_app = app.create_app()
+    with flask_app.app_context():
+        SlowOfflineAIProcessor.latency = latency
+        ai_processor = SlowOfflineAIProcessor()
+        ai_processor.kb_index  # Load the knowledge index before timing starts, as a warm worker would
+        flask_app.extensions['linkenite'] = {'ai_processor': ai_processor}
+        coordinator = app.get_coordinator()
+        leader = coordinator.try_acquire_leadership()
+
+        start.wait()
+        triaged = []
+        while True:
+            poll = app.triage_pending_emails(coordinator.worker_id, batch, time_budget)
+            if poll:
+                triaged.extend(email_data['id'] for email_data in poll)
+                continue
+            # Follow-ups wait for earlier messages held by other workers; stop once nothing is left
+            if not remaining(app):
+                break
+            time.sleep(latency)
+        results.put((leader, triaged, ai_processor.usage['calls']))
+
+
+def remaining(app):
+    conn = app.get_db_connection()
+    count = conn.execute("SELECT COUNT(*) FROM emails WHERE status IN ('New', 'Processing')").fetchone()[0]
+    conn.close()
+    return count
+
+
+def stale_threads(app):
+    """Count threads whose triage does not come from their newest message"""
+    conn = app.get_db_connection()
+    count = conn.execute('''
+        SELECT COUNT(*) FROM threads t
+        WHERE t.last_email_id IS NOT (SELECT id FROM emails WHERE thread_id = t.thread_id ORDER BY rowid DESC LIMIT 1)
+    ''').fetchone()[0]
+    conn.close()
+    return count
+
+
+def run(workers, emails, depth, latency, batch, time_budget):
+    with tempfile.TemporaryDirectory() as workdir:
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        import app
+
+        app.create_app()
+        app.ingest_emails(build_mailbox(emails // depth, depth))
+        os.chdir(cwd)
+
+        start = multiprocessing.Barrier(workers + 1)
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=run_worker, args=(workdir, latency, batch, time_budget, start, results))
+            for _ in range(workers)
+        ]
+        for process in processes:
+            process.start()
+
+        start.wait()
+        began = time.perf_counter()
+        outcomes = [results.get() for _ in processes]
+        elapsed = time.perf_counter() - began
+        for process in processes:
+            process.join()
+
+        os.chdir(workdir)
+        stale = stale_threads(app)
+        os.chdir(cwd)
+
+    leaders = sum(1 for leader, _, _ in outcomes if leader)
+    triaged = [email_id for _, ids, _ in outcomes for email_id in ids]
+    duplicates = len(triaged) - len(set(triaged))
+    calls = sum(calls for _, _, calls in outcomes)
+    return elapsed, leaders, len(set(triaged)), duplicates, calls, stale
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--emails', type=int, default=160)
+    parser.add_argument('--depth', default='1,4', help='Messages per thread, one run per value')
+    parser.add_argument('--workers', default='1,2,4,8')
+    parser.add_argument('--latency', type=float, default=0.05, help='Seconds per simulated model call')
+    parser.add_argument('--batch', type=int, default=COORDINATION_CONFIG['triage_batch'],
+                        help='Emails claimed at a time')
+    parser.add_argument('--time-budget', type=float, default=COORDINATION_CONFIG['triage_time_budget'],
+                        help='Seconds a poll keeps claiming')
+    args = parser.parse_args()
+
+    failed = False
+    for depth in (int(d) for d in args.depth.split(',')):
+        threads = args.emails // depth
+        emails = threads * depth
+        # Roots take the full four calls, follow-ups two incremental ones
+        expected_calls = threads * 4 + (emails - threads) * 2
+        print(f"\n{emails} emails in {threads} threads of {depth}")
+        print(f"{'workers':>8} {'seconds':>8} {'emails/s':>9} {'speedup':>8} {'efficiency':>11} {'leaders':>8} "
+              f"{'dupes':>6} {'calls':>6} {'stale':>6}")
+        baseline = None
+        for workers in (int(w) for w in args.workers.split(',')):
+            elapsed, leaders, triaged, duplicates, calls, stale = run(
+                workers, args.emails, depth, args.latency, args.batch, args.time_budget
+            )
+            throughput = triaged / elapsed
+            baseline = baseline or throughput
+            speedup = throughput / baseline
+            print(f"{workers:>8} {elapsed:>8.2f} {throughput:>9.1f} {speedup:>8.2f} {speedup / workers:>11.0%} "
+                  f"{leaders:>8} {duplicates:>6} {calls:>6} {stale:>6}")
+            failed = failed or triaged != emails or duplicates or leaders != 1 or calls != expected_calls or stale
+
+    if failed:
+        print("FAIL: every email must be triaged exactly once, in thread order, by workers under a single leader")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -27,10 +27,23 @@ KNOWLEDGE_BASE = {
         "Our standard response time for priority support is under 2 hours.",
         "We offer 24/7 support for enterprise customers only.",
         "System maintenance occurs every second Tuesday of the month from 2-4 AM UTC."
-    ]
+    ],
+    'index_path': 'kb_index.pkl'  # Precomputed TF-IDF index shared by all workers
 }
 
 # App Configuration
 DEBUG = True
 SECRET_KEY = 'your-secret-key-change-in-production'  # Replace with a secure key
 DATABASE_URI = 'sqlite:///emails.db'  # SQLite database for persistence
+DATABASE_PATH = DATABASE_URI[len('sqlite:///'):]
+
+# Multi-worker coordination: one worker (the lease holder) ingests from IMAP,
+# every worker claims and triages emails
+COORDINATION_CONFIG = {
+    'backend': 'sqlite',  # 'sqlite', 'file' or a name passed to coordination.register_backend
+    'backend_options': {'path': DATABASE_PATH},  # e.g. {'directory': '/var/run/linkenite'} for 'file'
+    'lease_ttl': 60,  # Seconds before a silent leader is replaced
+    'claim_ttl': 300,  # Seconds before an unfinished triage claim can be taken by another worker
+    'triage_batch': 1,  # Emails a worker claims at a time, so a cut-short poll strands at most this many
+    'triage_time_budget': 15  # Seconds after which a dashboard poll stops claiming; keep well under gunicorn --timeout
+}
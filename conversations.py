@@ -0,0 +1,240 @@
+import re
+from datetime import datetime
+from email.utils import parseaddr
+
+# Reply/forward prefixes stripped before comparing subjects (JWZ subject grouping)
+SUBJECT_PREFIX = re.compile(r'^\s*((re|fwd?|aw|sv)(\[\d+\])?\s*:\s*)+', re.IGNORECASE)
+MESSAGE_ID = re.compile(r'<[^<>\s]+>')
+
+# Lines that introduce the quoted copy of an earlier message in a reply
+REPLY_HEADERS = [
+    re.compile(r'^On\s.+\swrote:$', re.IGNORECASE | re.DOTALL),
+    re.compile(r'^-+\s*Original Message\s*-+$', re.IGNORECASE),
+    re.compile(r'^_{10,}$'),
+    re.compile(r'^From:\s.+$', re.IGNORECASE),
+]
+
+
+def init_thread_tables(conn):
+    """Create the threading index alongside the emails table"""
+    conn.execute('''
+                 CREATE TABLE IF NOT EXISTS thread_messages
+                 (
+                     message_id TEXT PRIMARY KEY,
+                     thread_id  TEXT NOT NULL,
+                     parent_id  TEXT,
+                     email_id   TEXT
+                 )
+                 ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_thread_messages_thread ON thread_messages (thread_id)')
+    conn.execute('''
+                 CREATE TABLE IF NOT EXISTS threads
+                 (
+                     thread_id     TEXT PRIMARY KEY,
+                     subject       TEXT,
+                     sender        TEXT,
+                     sentiment     TEXT,
+                     urgency       TEXT,
+                     requirements  TEXT,
+                     last_email_id TEXT,
+                     message_count INTEGER DEFAULT 0,
+                     updated_at    TEXT
+                 )
+                 ''')
+    # Thread tables created before sender matching lack this column
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(threads)')}
+    if 'sender' not in columns:
+        conn.execute('ALTER TABLE threads ADD COLUMN sender TEXT')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_threads_subject_sender ON threads (subject, sender)')
+
+
+def parse_message_ids(header):
+    """Return the message ids in a Message-ID/In-Reply-To/References header, in order"""
+    if not header:
+        return []
+    return MESSAGE_ID.findall(str(header))
+
+
+def normalize_subject(subject):
+    return SUBJECT_PREFIX.sub('', subject or '').strip().lower()
+
+
+def is_reply_subject(subject):
+    return bool(SUBJECT_PREFIX.match(subject or ''))
+
+
+def sender_address(sender):
+    """Return the lower-cased address from a From header such as 'Name <a@b.com>'"""
+    return parseaddr(sender or '')[1].lower()
+
+
+def strip_quoted(body):
+    """Return only the new text of a reply, dropping quoted history and attribution lines"""
+    if not body:
+        return ''
+
+    lines = []
+    for line in body.splitlines():
+        stripped = line.strip()
+        if stripped.startswith('>'):
+            continue
+        # Attribution lines are often wrapped: "On Mon, ... <a@b.com>\nwrote:"
+        wrapped = stripped.lower() == 'wrote:' and bool(lines)
+        candidate = f"{lines[-1].strip()} {stripped}" if wrapped else stripped
+        if any(pattern.match(candidate) for pattern in REPLY_HEADERS):
+            if wrapped:
+                lines.pop()
+            break
+        lines.append(line)
+
+    new_text = '\n'.join(lines).strip()
+    return new_text or body.strip()
+
+
+def _last_email_rowid(conn, thread_id):
+    row = conn.execute('''
+                       SELECT e.rowid FROM threads t JOIN emails e ON e.id = t.last_email_id
+                       WHERE t.thread_id = ?
+                       ''', (thread_id,)).fetchone()
+    return row[0] if row else None
+
+
+def _merge_threads(conn, target, others):
+    """Fold threads that turned out to be the same conversation into target
+
+    The merged thread keeps the triage of whichever thread's latest message
+    arrived last. Returns the ids of the emails that no longer head a thread.
+    """
+    retired = []
+    for other in others:
+        conn.execute('UPDATE thread_messages SET thread_id = ? WHERE thread_id = ?', (target, other))
+        conn.execute('UPDATE emails SET thread_id = ? WHERE thread_id = ?', (target, other))
+        row = conn.execute('SELECT * FROM threads WHERE thread_id = ?', (other,)).fetchone()
+        if not row:
+            continue
+
+        target_rowid = _last_email_rowid(conn, target)
+        other_rowid = _last_email_rowid(conn, other)
+        if other_rowid is not None and (target_rowid is None or other_rowid > target_rowid):
+            retired_id = conn.execute('SELECT last_email_id FROM threads WHERE thread_id = ?',
+                                      (target,)).fetchone()[0]
+            conn.execute('''
+                         UPDATE threads
+                         SET sentiment     = ?,
+                             urgency       = ?,
+                             requirements  = ?,
+                             last_email_id = ?
+                         WHERE thread_id = ?
+                         ''', (row['sentiment'], row['urgency'], row['requirements'], row['last_email_id'], target))
+        else:
+            retired_id = row['last_email_id']
+        if retired_id is not None:
+            retired.append(retired_id)
+
+        conn.execute('UPDATE threads SET message_count = message_count + ? WHERE thread_id = ?',
+                     (row['message_count'] or 0, target))
+        conn.execute('DELETE FROM threads WHERE thread_id = ?', (other,))
+    return retired
+
+
+def assign_thread(conn, email_data):
+    """Place a message in the threading index and return its thread as a dict
+
+    Follows JWZ threading: every id in References/In-Reply-To becomes a
+    container (possibly empty, if we never saw that message) linked to its
+    parent, and all containers reachable from one another share a thread.
+    Messages without any usable references fall back to subject grouping
+    when the subject is marked as a reply, but only within threads started
+    by the same sender: support subjects are too generic to match on alone.
+    """
+    message_id = email_data.get('message_id') or f"<local-{email_data['id']}>"
+    ancestry = list(email_data.get('references') or [])
+    in_reply_to = email_data.get('in_reply_to')
+    if in_reply_to and in_reply_to not in ancestry:
+        ancestry.append(in_reply_to)
+    ancestry = [mid for mid in ancestry if mid != message_id]
+
+    candidates = ancestry + [message_id]
+    placeholders = ', '.join('?' for _ in candidates)
+    rows = conn.execute(
+        f'SELECT message_id, thread_id FROM thread_messages WHERE message_id IN ({placeholders})',
+        candidates
+    ).fetchall()
+    known = {row[0]: row[1] for row in rows}
+
+    thread_ids = []
+    for mid in candidates:
+        if mid in known and known[mid] not in thread_ids:
+            thread_ids.append(known[mid])
+
+    subject = normalize_subject(email_data.get('subject'))
+    sender = sender_address(email_data.get('sender'))
+    if thread_ids:
+        thread_id = thread_ids[0]
+        email_data['retired_email_ids'] = _merge_threads(conn, thread_id, thread_ids[1:])
+    else:
+        row = None
+        if is_reply_subject(email_data.get('subject')) and subject and sender:
+            row = conn.execute(
+                'SELECT thread_id FROM threads WHERE subject = ? AND sender = ? ORDER BY updated_at DESC LIMIT 1',
+                (subject, sender)
+            ).fetchone()
+        thread_id = row[0] if row else (ancestry[0] if ancestry else message_id)
+
+    parent_id = None
+    for mid in ancestry:
+        conn.execute(
+            'INSERT OR IGNORE INTO thread_messages (message_id, thread_id, parent_id) VALUES (?, ?, ?)',
+            (mid, thread_id, parent_id)
+        )
+        parent_id = mid
+    conn.execute('''
+                 INSERT INTO thread_messages (message_id, thread_id, parent_id, email_id)
+                 VALUES (?, ?, ?, ?)
+                 ON CONFLICT(message_id) DO UPDATE SET email_id  = excluded.email_id,
+                                                       parent_id = COALESCE(thread_messages.parent_id, excluded.parent_id)
+                 ''', (message_id, thread_id, parent_id, email_data['id']))
+
+    conn.execute('INSERT OR IGNORE INTO threads (thread_id, subject, sender, message_count) VALUES (?, ?, ?, 0)',
+                 (thread_id, subject, sender))
+
+    email_data['thread_id'] = thread_id
+    return get_thread(conn, thread_id)
+
+
+def get_thread(conn, thread_id):
+    thread = conn.execute('SELECT * FROM threads WHERE thread_id = ?', (thread_id,)).fetchone()
+    return {key: thread[key] for key in thread.keys()} if thread else None
+
+
+def has_prior_triage(thread):
+    return bool(thread.get('message_count')) and thread.get('requirements') is not None
+
+
+def record_triage(conn, email_data):
+    """Store the latest triage on the thread so the next follow-up can build on it
+
+    A triage only replaces the thread's current one if its email arrived
+    later (by rowid), so a late save of an older message never rolls it back.
+    Returns True if it did.
+    """
+    conn.execute('UPDATE threads SET message_count = message_count + 1, updated_at = ? WHERE thread_id = ?',
+                 (datetime.now().isoformat(), email_data['thread_id']))
+    cursor = conn.execute('''
+                 UPDATE threads
+                 SET sentiment     = ?,
+                     urgency       = ?,
+                     requirements  = ?,
+                     last_email_id = ?
+                 WHERE thread_id = ?
+                   AND COALESCE((SELECT rowid FROM emails WHERE id = threads.last_email_id), -1)
+                     <= (SELECT rowid FROM emails WHERE id = ?)
+                 ''', (
+                     email_data['sentiment'],
+                     email_data['urgency'],
+                     email_data['requirements'],
+                     email_data['id'],
+                     email_data['thread_id'],
+                     email_data['id']
+                 ))
+    return bool(cursor.rowcount)
@@ -0,0 +1,162 @@
+import json
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from config import COORDINATION_CONFIG
+
+
+class LeaseBackend:
+    """Storage for named, expiring leases
+
+    Subclass and register with register_backend() to coordinate through
+    another store (Redis, etcd, a shared database, ...).
+    """
+
+    def acquire(self, name, holder, ttl):
+        """Take or renew the lease for `holder`; return True if it now holds it"""
+        raise NotImplementedError
+
+    def release(self, name, holder):
+        """Give up the lease if `holder` currently holds it"""
+        raise NotImplementedError
+
+
+class SQLiteLeaseBackend(LeaseBackend):
+    """Leases stored in a SQLite table, shared by every process using the same file"""
+
+    def __init__(self, path):
+        # Resolved now so the atexit release still finds the database if the cwd has changed
+        self.path = os.path.abspath(path)
+        conn = self._connect()
+        with conn:
+            conn.execute('''
+                         CREATE TABLE IF NOT EXISTS leases
+                         (
+                             name       TEXT PRIMARY KEY,
+                             holder     TEXT NOT NULL,
+                             expires_at REAL NOT NULL
+                         )
+                         ''')
+        conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def acquire(self, name, holder, ttl):
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                # Insert, or take over only if we already hold it or it has expired
+                cursor = conn.execute('''
+                                      INSERT INTO leases (name, holder, expires_at)
+                                      VALUES (?, ?, ?)
+                                      ON CONFLICT(name) DO UPDATE SET holder     = excluded.holder,
+                                                                      expires_at = excluded.expires_at
+                                      WHERE leases.holder = excluded.holder
+                                         OR leases.expires_at < ?
+                                      ''', (name, holder, now + ttl, now))
+            return cursor.rowcount == 1
+        finally:
+            conn.close()
+
+    def release(self, name, holder):
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute('DELETE FROM leases WHERE name = ? AND holder = ?', (name, holder))
+        finally:
+            conn.close()
+
+
+class FileLeaseBackend(LeaseBackend):
+    """Leases stored in lock files, guarded by flock (POSIX only)"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name):
+        return os.path.join(self.directory, f"{name}.lease")
+
+    def _update(self, name, update):
+        # Imported here so the module still loads on platforms without fcntl
+        import fcntl
+
+        fd = os.open(self._path(name), os.O_RDWR | os.O_CREAT, 0o644)
+        with os.fdopen(fd, 'r+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                content = f.read()
+                lease = json.loads(content) if content else {}
+                new_lease = update(lease)
+                if new_lease is not None:
+                    f.seek(0)
+                    f.truncate()
+                    json.dump(new_lease, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                return new_lease
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def acquire(self, name, holder, ttl):
+        now = time.time()
+
+        def take(lease):
+            if lease.get('holder') not in (None, holder) and lease.get('expires_at', 0) >= now:
+                return None
+            return {'holder': holder, 'expires_at': now + ttl}
+
+        return self._update(name, take) is not None
+
+    def release(self, name, holder):
+        self._update(name, lambda lease: {} if lease.get('holder') == holder else None)
+
+
+BACKENDS = {
+    'sqlite': SQLiteLeaseBackend,
+    'file': FileLeaseBackend
+}
+
+
+def register_backend(name, factory):
+    """Make a LeaseBackend available under COORDINATION_CONFIG['backend']"""
+    BACKENDS[name] = factory
+
+
+class Coordinator:
+    """Elects a single ingestion leader among all workers sharing a lease backend"""
+
+    def __init__(self, backend, lease_ttl, lease_name='ingest'):
+        self.backend = backend
+        self.lease_ttl = lease_ttl
+        self.lease_name = lease_name
+        self._token = uuid.uuid4().hex[:8]
+
+    @classmethod
+    def from_config(cls, config=None):
+        config = config or COORDINATION_CONFIG
+        backend = BACKENDS[config['backend']](**config.get('backend_options', {}))
+        return cls(backend, config['lease_ttl'])
+
+    @property
+    def worker_id(self):
+        # The pid is read on each call so forked workers never share an identity
+        return f"{socket.gethostname()}:{os.getpid()}:{self._token}"
+
+    def try_acquire_leadership(self):
+        """Take or renew the ingestion lease; return True if this worker is the leader"""
+        try:
+            return self.backend.acquire(self.lease_name, self.worker_id, self.lease_ttl)
+        except Exception as e:
+            print(f"Error acquiring {self.lease_name} lease: {e}")
+            return False
+
+    def release_leadership(self):
+        try:
+            self.backend.release(self.lease_name, self.worker_id)
+        except Exception as e:
+            print(f"Error releasing {self.lease_name} lease: {e}")
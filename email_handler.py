@@ -7,6 +7,7 @@ import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from config import EMAIL_CONFIG
+from conversations import parse_message_ids
 
 
 class EmailHandler:
@@ -43,7 +44,8 @@ class EmailHandler:
 
             # Search for emails from the last 24 hours
             since_date = (datetime.now() - timedelta(days=1)).strftime("%d-%b-%Y")
-            status, messages = self.mail.search(None, f'(SINCE {since_date})')
+            # UIDs, unlike sequence numbers, stay the same when other messages are expunged
+            status, messages = self.mail.uid('SEARCH', None, f'(SINCE {since_date})')
 
             if status != 'OK':
                 self.disconnect()
@@ -54,7 +56,7 @@ class EmailHandler:
             for email_id in email_ids:
                 try:
                     # Use BODY.PEEK[] instead of RFC822 to avoid marking as read
-                    status, msg_data = self.mail.fetch(email_id, '(BODY.PEEK[])')
+                    status, msg_data = self.mail.uid('FETCH', email_id, '(BODY.PEEK[])')
 
                     if status != 'OK' or not msg_data:
                         continue
@@ -108,6 +110,10 @@ class EmailHandler:
         # Extract date
         date = msg.get("Date", "")
 
+        # Extract threading headers
+        message_ids = parse_message_ids(msg.get("Message-ID"))
+        in_reply_to = parse_message_ids(msg.get("In-Reply-To"))
+
         # Extract body
         body = ""
         try:
@@ -150,24 +156,33 @@ class EmailHandler:
             'subject': subject,
             'body': body,
             'date': date,
+            'message_id': message_ids[0] if message_ids else None,
+            'in_reply_to': in_reply_to[-1] if in_reply_to else None,
+            'references': parse_message_ids(msg.get("References")),
             'contacts': {
                 'phone_numbers': list(set(phone_numbers)),
                 'emails': list(set(emails))
             }
         }
 
-    def mark_as_processed(self, email_id):
-        """Mark email as processed (read)"""
+    def mark_as_processed(self, email_ids):
+        """Mark one or more emails (by UID) as processed (read) with a single UID STORE"""
+        if isinstance(email_ids, (str, bytes)):
+            email_ids = [email_ids]
+        # Build an IMAP UID set such as "3,7,12" so the server gets one command
+        message_set = ','.join(
+            email_id.decode() if isinstance(email_id, bytes) else str(email_id) for email_id in email_ids
+        )
+        if not message_set:
+            return True
+
         # Connect fresh for each operation
         if not self.connect():
             return False
 
         try:
-            # Ensure email_id is in the correct format
-            if isinstance(email_id, str):
-                email_id = email_id.encode()
-            self.mail.store(email_id, '+FLAGS', '\\Seen')
-            return True
+            status, _ = self.mail.uid('STORE', message_set, '+FLAGS', '(\\Seen)')
+            return status == 'OK'
         except Exception as e:
             print(f"Error marking email as processed: {e}")
             return False
@@ -175,33 +190,62 @@ class EmailHandler:
             # Clean up connection
             self.disconnect()
 
+    def _build_message(self, to_email, subject, body, reply_to=None):
+        msg = MIMEMultipart()
+        msg['From'] = EMAIL_CONFIG['username']
+        msg['To'] = to_email
+        msg['Subject'] = subject
+
+        if reply_to:
+            msg['In-Reply-To'] = reply_to
+            msg['References'] = reply_to
+
+        # Add body to email
+        msg.attach(MIMEText(body, 'plain'))
+        return msg
+
     def send_email(self, to_email, subject, body, reply_to=None):
         """Send an email using SMTP"""
-        try:
-            # Create message
-            msg = MIMEMultipart()
-            msg['From'] = EMAIL_CONFIG['username']
-            msg['To'] = to_email
-            msg['Subject'] = subject
+        return self.send_emails([{
+            'to_email': to_email,
+            'subject': subject,
+            'body': body,
+            'reply_to': reply_to
+        }])[0]
 
-            if reply_to:
-                msg['In-Reply-To'] = reply_to
-                msg['References'] = reply_to
+    def send_emails(self, messages):
+        """Send a batch of emails over one SMTP session
 
-            # Add body to email
-            msg.attach(MIMEText(body, 'plain'))
+        Each message is a dict with to_email, subject, body and optional
+        reply_to. Returns a list of booleans, one per message, in order.
+        """
+        results = [False] * len(messages)
+        if not messages:
+            return results
 
+        try:
             # Create SMTP session
             server = smtplib.SMTP(EMAIL_CONFIG['smtp_server'], EMAIL_CONFIG['smtp_port'])
             server.starttls()
             server.login(EMAIL_CONFIG['username'], EMAIL_CONFIG['password'])
-
-            # Send email
-            text = msg.as_string()
-            server.sendmail(EMAIL_CONFIG['username'], to_email, text)
-            server.quit()
-
-            return True
         except Exception as e:
             print(f"Error sending email: {e}")
-            return False
\ No newline at end of file
+            return results
+
+        try:
+            for i, message in enumerate(messages):
+                try:
+                    msg = self._build_message(
+                        message['to_email'], message['subject'], message['body'], message.get('reply_to')
+                    )
+                    server.sendmail(EMAIL_CONFIG['username'], message['to_email'], msg.as_string())
+                    results[i] = True
+                except Exception as e:
+                    print(f"Error sending email to {message.get('to_email')}: {e}")
+        finally:
+            try:
+                server.quit()
+            except Exception as e:
+                print(f"Error closing SMTP session: {e}")
+
+        return results
\ No newline at end of file
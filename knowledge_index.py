@@ -0,0 +1,86 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from config import KNOWLEDGE_BASE
+
+PICKLE_PROTOCOL = pickle.HIGHEST_PROTOCOL
+
+
+def fingerprint(documents):
+    """Hash the knowledge base and the format it is stored in, so a stale index on disk can be detected
+
+    The scikit-learn version is included because a pickled vectorizer is
+    only guaranteed to load correctly in the version that fitted it.
+    """
+    import sklearn
+
+    key = {
+        'documents': documents,
+        'sklearn': sklearn.__version__,
+        'pickle_protocol': PICKLE_PROTOCOL
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def build_index(documents):
+    """Fit the TF-IDF vectorizer over the knowledge base documents"""
+    # Imported here so scikit-learn is only loaded when an index is needed
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    vectorizer = TfidfVectorizer().fit(documents)
+    return {
+        'fingerprint': fingerprint(documents),
+        'vectorizer': vectorizer,
+        'vectors': vectorizer.transform(documents)
+    }
+
+
+def save_index(index, path):
+    """Write the index atomically so concurrent workers never read a partial file
+
+    The fingerprint is written as its own record ahead of the index, so a
+    reader can reject a stale file without unpickling the vectorizer.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.kb_index-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(index['fingerprint'], f, protocol=PICKLE_PROTOCOL)
+            pickle.dump(index, f, protocol=PICKLE_PROTOCOL)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def load_index(documents, path=None):
+    """Load the precomputed index from disk, rebuilding it if missing or stale"""
+    path = path or KNOWLEDGE_BASE['index_path']
+    expected = fingerprint(documents)
+
+    try:
+        with open(path, 'rb') as f:
+            # Files from another knowledge base, scikit-learn version or format fail here
+            if pickle.load(f) == expected:
+                return pickle.load(f)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Error loading knowledge index from {path}: {e}")
+
+    index = build_index(documents)
+    try:
+        save_index(index, path)
+    except OSError as e:
+        print(f"Error saving knowledge index to {path}: {e}")
+    return index
+
+
+if __name__ == '__main__':
+    # Precompute the index once (e.g. at deploy time) so web workers only load it
+    index = build_index(KNOWLEDGE_BASE['faqs'])
+    save_index(index, KNOWLEDGE_BASE['index_path'])
+    print(f"Wrote knowledge index for {len(KNOWLEDGE_BASE['faqs'])} documents to {KNOWLEDGE_BASE['index_path']}")
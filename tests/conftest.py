@@ -0,0 +1,64 @@
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+
+class FakeMailbox:
+    """Stands in for EmailHandler: serves `mails` to the leader and records what is sent"""
+
+    def __init__(self):
+        self.mails = []
+        self.marked = []
+        self.sent = []
+
+    def search_emails(self):
+        return list(self.mails)
+
+    def mark_as_processed(self, email_ids):
+        self.marked.append(sorted(email_ids))
+        return True
+
+    def send_emails(self, messages):
+        self.sent.extend(messages)
+        return [True] * len(messages)
+
+
+def make_email(email_id, sender, subject, body='Please help.', message_id=None, references=()):
+    """Return a parsed email dict as EmailHandler.parse_email would"""
+    references = list(references)
+    return {
+        'id': email_id,
+        'sender': sender,
+        'subject': subject,
+        'body': body,
+        'date': f"Mon, 1 Jan 2024 00:00:{int(email_id) % 60:02d} +0000",
+        'message_id': message_id or f"<{email_id}@example.com>",
+        'in_reply_to': references[-1] if references else None,
+        'references': references
+    }
+
+
+@pytest.fixture
+def flask_app(tmp_path, monkeypatch):
+    """An app with a fresh database in tmp_path, with IMAP and OpenAI replaced by offline fakes"""
+    monkeypatch.chdir(tmp_path)
+    import app
+    from benchmarks.threading_savings import OfflineAIProcessor
+
+    flask_app = app.create_app()
+    flask_app.extensions['linkenite'] = {'email_handler': FakeMailbox(), 'ai_processor': OfflineAIProcessor()}
+    return flask_app
+
+
+@pytest.fixture
+def mailbox(flask_app):
+    return flask_app.extensions['linkenite']['email_handler']
+
+
+@pytest.fixture
+def client(flask_app):
+    return flask_app.test_client()
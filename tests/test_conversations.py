@@ -0,0 +1,109 @@
+import sqlite3
+
+import pytest
+
+from conftest import make_email
+from conversations import assign_thread, init_thread_tables, strip_quoted
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    conn.row_factory = sqlite3.Row
+    conn.execute('CREATE TABLE emails (id TEXT PRIMARY KEY, thread_id TEXT)')
+    init_thread_tables(conn)
+    yield conn
+    conn.close()
+
+
+def thread_of(conn, email_data):
+    conn.execute('INSERT INTO emails (id) VALUES (?)', (email_data['id'],))
+    return assign_thread(conn, email_data)['thread_id']
+
+
+def test_reply_without_references_joins_thread_of_same_sender(conn):
+    root = thread_of(conn, make_email('1', 'Alice <alice@example.com>', 'Help'))
+    reply = thread_of(conn, make_email('2', 'alice@example.com', 'Re: Help'))
+
+    assert reply == root
+
+
+def test_generic_subject_from_other_sender_starts_new_thread(conn):
+    root = thread_of(conn, make_email('1', 'Alice <alice@example.com>', 'Help'))
+    other = thread_of(conn, make_email('2', 'Bob <bob@example.com>', 'Re: Help'))
+
+    assert other != root
+
+
+def test_references_header_merges_two_threads(client, mailbox):
+    mailbox.mails = [
+        make_email('1', 'Alice <alice@example.com>', 'Login broken', message_id='<a@example.com>'),
+        make_email('2', 'Bob <bob@example.com>', 'Cannot sign in', message_id='<b@example.com>'),
+    ]
+    assert len(client.get('/api/emails').json['emails']) == 2
+
+    mailbox.mails.append(make_email('3', 'Alice <alice@example.com>', 'Re: Login broken',
+                                    references=['<a@example.com>', '<b@example.com>']))
+    response = client.get('/api/emails').json
+
+    import app
+    conn = app.get_db_connection()
+    threads = conn.execute('SELECT * FROM threads').fetchall()
+    conn.close()
+    assert len(threads) == 1
+    assert threads[0]['last_email_id'] == '3'
+    assert threads[0]['message_count'] == 3
+    assert [email['id'] for email in response['emails']] == ['3']
+    assert response['emails'][0]['message_count'] == 3
+    assert response['stats']['total_received'] == 1
+    assert response['stats']['pending'] == 1
+
+
+def test_stats_count_threads_not_messages(client, mailbox):
+    for thread in ('a', 'b'):
+        references = []
+        for n in range(3):
+            email_id = str(len(mailbox.mails) + 1)
+            message_id = f"<{thread}{n}@example.com>"
+            mailbox.mails.append(make_email(email_id, f"{thread} <{thread}@example.com>", 'Re: Help' if n else 'Help',
+                                            message_id=message_id, references=references))
+            references = references + [message_id]
+
+    stats = client.get('/api/emails').json['stats']
+    assert (stats['total_received'], stats['pending'], stats['resolved']) == (2, 2, 0)
+    assert sum(stats['by_urgency'].values()) == 2
+
+    client.post('/api/emails/bulk/update', json={'ids': ['1', '2', '3'], 'status': 'Resolved'})
+    stats = client.get('/api/stats').json
+    assert (stats['total_received'], stats['pending'], stats['resolved']) == (2, 1, 1)
+
+
+def test_strip_quoted_drops_outlook_original_message():
+    body = (
+        "Still waiting on the refund.\n"
+        "\n"
+        "-----Original Message-----\n"
+        "From: Support <support@company.com>\n"
+        "Sent: Monday, January 1, 2024 10:00 AM\n"
+        "Subject: RE: Refund\n"
+        "\n"
+        "We are looking into it."
+    )
+
+    assert strip_quoted(body) == "Still waiting on the refund."
+
+
+def test_strip_quoted_drops_wrapped_attribution_line():
+    body = (
+        "Thanks, that fixed it.\n"
+        "\n"
+        "On Mon, 1 Jan 2024 at 10:00, Support Team <support@company.com>\n"
+        "wrote:\n"
+        "> Please try clearing your cache."
+    )
+
+    assert strip_quoted(body) == "Thanks, that fixed it."
+
+
+def test_strip_quoted_keeps_message_without_quotes():
+    assert strip_quoted("Nothing quoted here.\nSecond line.") == "Nothing quoted here.\nSecond line."
@@ -0,0 +1,89 @@
+import itertools
+
+import pytest
+
+import coordination
+from conftest import make_email
+from coordination import FileLeaseBackend, SQLiteLeaseBackend
+
+
+def statuses(app):
+    conn = app.get_db_connection()
+    rows = conn.execute('SELECT id, status FROM emails ORDER BY rowid').fetchall()
+    conn.close()
+    return {row['id']: row['status'] for row in rows}
+
+
+def test_poll_stops_claiming_after_time_budget(flask_app, monkeypatch):
+    import app
+
+    app.ingest_emails([make_email(str(n), f"c{n}@example.com", 'Help') for n in range(1, 6)])
+    clock = itertools.count(step=10)
+    monkeypatch.setattr(app.time, 'monotonic', lambda: next(clock))
+
+    with flask_app.app_context():
+        triaged = app.triage_pending_emails('worker', 1, 15)
+
+    assert [email_data['id'] for email_data in triaged] == ['1']
+    assert statuses(app) == {'1': 'Pending', '2': 'New', '3': 'New', '4': 'New', '5': 'New'}
+
+
+@pytest.fixture(params=['sqlite', 'file'])
+def backend(request, tmp_path):
+    if request.param == 'sqlite':
+        return SQLiteLeaseBackend(str(tmp_path / 'leases.db'))
+    return FileLeaseBackend(str(tmp_path / 'leases'))
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(coordination.time, 'time', lambda: now[0])
+    return now
+
+
+def test_live_lease_is_refused(backend, clock):
+    assert backend.acquire('ingest', 'a', 60)
+    clock[0] += 59
+
+    assert not backend.acquire('ingest', 'b', 60)
+    assert backend.acquire('ingest', 'a', 60)
+
+
+def test_expired_lease_is_taken_over(backend, clock):
+    assert backend.acquire('ingest', 'a', 60)
+    clock[0] += 61
+
+    assert backend.acquire('ingest', 'b', 60)
+    assert not backend.acquire('ingest', 'a', 60)
+
+
+def test_released_lease_is_free(backend, clock):
+    assert backend.acquire('ingest', 'a', 60)
+    backend.release('ingest', 'b')
+    assert not backend.acquire('ingest', 'b', 60)
+
+    backend.release('ingest', 'a')
+    assert backend.acquire('ingest', 'b', 60)
+
+
+def triage(email_data):
+    return dict(email_data, sentiment='Neutral', urgency='Not urgent', requirements='None',
+                ai_response='Thanks', processed_at='2024-01-01T00:00:00')
+
+
+def test_stale_claim_is_taken_over_and_late_save_discarded(flask_app, monkeypatch):
+    import app
+
+    app.ingest_emails([make_email('1', 'a@example.com', 'Help')])
+    [claimed] = app.claim_emails('a', 1)
+    assert app.claim_emails('b', 1) == []
+
+    monkeypatch.setitem(app.COORDINATION_CONFIG, 'claim_ttl', -1)
+    [taken] = app.claim_emails('b', 1)
+    assert taken['id'] == '1'
+
+    assert not app.save_triage_to_db(triage(claimed), 'a')
+    assert statuses(app) == {'1': 'Processing'}
+    assert app.save_triage_to_db(triage(taken), 'b')
+    assert statuses(app) == {'1': 'Pending'}
@@ -0,0 +1,66 @@
+from email.message import EmailMessage
+
+import pytest
+
+from conftest import make_email
+from email_handler import EmailHandler
+
+
+class FakeIMAP:
+    """Records UID commands; message numbers are only valid as UIDs"""
+
+    def __init__(self, messages):
+        self.messages = messages
+        self.commands = []
+
+    def uid(self, command, *args):
+        self.commands.append((command,) + args)
+        if command == 'SEARCH':
+            return 'OK', [b' '.join(self.messages)]
+        if command == 'FETCH':
+            return 'OK', [(b'1 (UID ' + args[0] + b' BODY[] {0}', self.messages[args[0]]), b')']
+        return 'OK', [None]
+
+    def logout(self):
+        pass
+
+
+@pytest.fixture
+def imap(monkeypatch):
+    messages = {}
+    for uid in (b'41', b'57'):
+        msg = EmailMessage()
+        msg['From'] = 'Customer <customer@example.com>'
+        msg['Subject'] = f"Support request {uid.decode()}"
+        msg['Message-ID'] = f"<{uid.decode()}@example.com>"
+        msg.set_content('Please help.')
+        messages[uid] = msg.as_bytes()
+    imap = FakeIMAP(messages)
+
+    def connect(handler):
+        handler.mail = imap
+        return True
+
+    monkeypatch.setattr(EmailHandler, 'connect', connect)
+    return imap
+
+
+def test_search_uses_uids(imap):
+    emails = EmailHandler().search_emails()
+
+    assert [email_data['id'] for email_data in emails] == ['41', '57']
+    assert [command[0] for command in imap.commands] == ['SEARCH', 'FETCH', 'FETCH']
+
+
+def test_mark_as_processed_stores_seen_on_given_uids_only(imap):
+    assert EmailHandler().mark_as_processed(['57', b'41'])
+
+    assert imap.commands == [('STORE', '57,41', '+FLAGS', '(\\Seen)')]
+
+
+def test_ingest_skips_message_already_stored_under_another_id(flask_app):
+    import app
+
+    assert app.ingest_emails([make_email('3', 'a@example.com', 'Help', message_id='<m@example.com>')]) == 1
+    assert app.ingest_emails([make_email('41', 'a@example.com', 'Help', message_id='<m@example.com>')]) == 0
+    assert list(app.load_emails_by_ids(['3', '41'])) == ['3']